@@ -11,15 +11,36 @@ from typing import Dict, List, Tuple, Optional
 import matplotlib.pyplot as plt
 import seaborn as sns
 from datetime import datetime, timedelta
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import hashlib
+import io
 import warnings
 warnings.filterwarnings('ignore')
 
+try:
+    import bottleneck as bn
+except ImportError:
+    # Optional accelerator; rolling windows fall back to pandas
+    bn = None
+
 class MarketAnalyzer:
     """
     Comprehensive market analysis toolkit for systematic trading strategies
     """
     
-    def __init__(self, symbols: List[str], benchmark: str = 'SPY', lookback_days: int = 252):
+    # Max mean^2 / variance before post-hoc covariance is abandoned for explicit centering
+    CANCELLATION_RATIO = 1e6
+    
+    # Storage type for returns, rolling windows and OBV; metrics only compare these against
+    # thresholds and percentiles, so single precision halves memory traffic at no practical cost
+    FLOAT_DTYPE = np.float32
+    
+    # Default lookback for trend-strength regressions
+    TREND_WINDOW = 20
+    
+    def __init__(self, symbols: List[str], benchmark: str = 'SPY', lookback_days: int = 252,
+                 cache_dir: Optional[str] = '.cache'):
         """
         Initialize MarketAnalyzer with symbols and parameters
         
@@ -27,211 +48,277 @@ class MarketAnalyzer:
             symbols: List of stock symbols to analyze
             benchmark: Benchmark symbol (default: SPY)
             lookback_days: Historical data lookback period
+            cache_dir: Directory for cached price data (None disables caching)
         """
         self.symbols = symbols
         self.benchmark = benchmark
         self.lookback_days = lookback_days
+        self.cache_dir = cache_dir
+        
         self.data: Optional[pd.DataFrame] = None
         self.returns: Optional[pd.DataFrame] = None
         
+        # Memoized metric results and the inputs (data, returns, symbols, benchmark) they were computed from
+        self._metric_cache: Dict[str, object] = {}
+        self._metric_cache_source: Optional[tuple] = None
+        
+        # Centered regressor x = 0..TREND_WINDOW-1 and its sum of squares, shared by every trend fit
+        self._trend_x_centered = np.arange(self.TREND_WINDOW, dtype=np.float64) - (self.TREND_WINDOW - 1) / 2
+        self._trend_sxx = self._trend_x_centered @ self._trend_x_centered
+        
     def fetch_data(self) -> pd.DataFrame:
         """Fetch historical price data for all symbols"""
         print(f"📊 Fetching data for {len(self.symbols)} symbols...")
         
-        all_symbols = self.symbols + [self.benchmark] if self.benchmark not in self.symbols else self.symbols
+        # Symbols plus benchmark, deduplicated with order kept
+        all_symbols = list(dict.fromkeys([*self.symbols, self.benchmark]))
         
         end_date = datetime.now()
         start_date = end_date - timedelta(days=self.lookback_days + 50)  # Extra buffer
         
+        cache_path = self._cache_path(all_symbols, end_date)
+        if cache_path is not None and cache_path.exists():
+            try:
+                cached = pd.read_parquet(cache_path, columns=all_symbols)
+                if self._is_complete_download(cached, all_symbols):
+                    self._set_price_data(cached)
+                    print(f"✅ Loaded {len(self.data)} days of cached data from {cache_path}")
+                    return self.data
+                print(f"⚠️ Ignoring incomplete cache {cache_path}")
+            except Exception as e:
+                print(f"⚠️ Ignoring unreadable cache {cache_path}: {e}")
+        
         try:
-            data = yf.download(all_symbols, start=start_date, end=end_date)['Adj Close']
-            self.data = data.dropna()
-            self.returns = self.data.pct_change().dropna()
+            data = yf.download(all_symbols, start=start_date, end=end_date, threads=True, progress=False)['Adj Close']
+            # yfinance reports a failed ticker as an all-NaN column rather than raising
+            complete = self._is_complete_download(data, all_symbols)
+            self._set_price_data(data.dropna())
             print(f"✅ Successfully fetched {len(self.data)} days of data")
-            return self.data
         except Exception as e:
             print(f"❌ Error fetching data: {e}")
             raise
+        
+        # Only cache full snapshots, so a failed or partial download is retried on the next run
+        if cache_path is not None and complete and not self.data.empty:
+            try:
+                cache_path.parent.mkdir(parents=True, exist_ok=True)
+                self.data.to_parquet(cache_path)
+            except Exception as e:
+                # Parquet needs pyarrow or fastparquet; caching is best-effort
+                print(f"⚠️ Could not cache data to {cache_path}: {e}")
+        
+        return self.data
     
     def calculate_volatility_metrics(self) -> Dict[str, Dict[str, float]]:
         """Calculate comprehensive volatility metrics for all symbols"""
         if self.returns is None:
             self.fetch_data()
         
+        cache = self._current_metric_cache()
+        if 'volatility' in cache:
+            return self._copy_symbol_metrics(cache['volatility'])
+        
         print("📈 Calculating volatility metrics...")
         
+        available = frozenset(self.returns.columns)
+        symbols = [s for s in self.symbols if s in available]
+        if not symbols:
+            return {}
+        
+        # Column-major so each symbol's returns are one contiguous span
+        R = np.asfortranarray(self.returns[symbols].to_numpy())
+        
+        # Basic volatility metrics (reductions accumulate in float64)
+        daily_vol = R.std(axis=0, ddof=1, dtype=np.float64)
+        annualized_vol = daily_vol * np.sqrt(252)
+        
+        # Rolling volatility (different windows)
+        rolling_vol_20 = self._rolling_std(R, 20)
+        rolling_vol_60 = self._rolling_std(R, 60)
+        vol_20d = rolling_vol_20[-1] * np.sqrt(252)
+        vol_60d = rolling_vol_60[-1] * np.sqrt(252)
+        
+        # Volatility percentiles (rank of daily vol within the rolling 60d history;
+        # NaN warm-up rows sort to the end of each column and are excluded from the count)
+        rolling_sorted = np.sort(rolling_vol_60, axis=0)
+        valid_count = (~np.isnan(rolling_vol_60)).sum(axis=0)
+        below = np.empty(R.shape[1])
+        at_or_below = np.empty(R.shape[1])
+        for j in range(R.shape[1]):
+            below[j] = np.searchsorted(rolling_sorted[:, j], daily_vol[j], side='left')
+            at_or_below[j] = np.searchsorted(rolling_sorted[:, j], daily_vol[j], side='right')
+        with np.errstate(invalid='ignore', divide='ignore'):
+            vol_percentile = (below + at_or_below + (at_or_below > below)) * 50.0 / valid_count
+        
+        # Downside deviation
+        downside_count = (R < 0).sum(axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            downside_std = np.nanstd(np.where(R < 0, R, np.nan), axis=0, ddof=1, dtype=np.float64)
+        downside_vol = np.where(downside_count > 0, downside_std * np.sqrt(252), 0.0)
+        
+        # Volatility clustering (ARCH effect)
+        arch_stat = self._ljung_box_test(R.astype(np.float64) ** 2)
+        
         metrics = {}
         
-        for symbol in self.symbols:
-            if symbol not in self.returns.columns:
-                continue
-                
-            returns = self.returns[symbol].dropna()
-            
-            # Basic volatility metrics
-            daily_vol = returns.std()
-            annualized_vol = daily_vol * np.sqrt(252)
-            
-            # Rolling volatility (different windows)
-            vol_20d = returns.rolling(20).std().iloc[-1] * np.sqrt(252)
-            vol_60d = returns.rolling(60).std().iloc[-1] * np.sqrt(252)
-            
-            # Volatility percentiles
-            vol_percentile = stats.percentileofscore(returns.rolling(60).std().dropna(), daily_vol)
-            
-            # Downside deviation
-            downside_returns = returns[returns < 0]
-            downside_vol = downside_returns.std() * np.sqrt(252) if len(downside_returns) > 0 else 0
-            
-            # Volatility clustering (ARCH effect)
-            squared_returns = returns ** 2
-            arch_stat = self._ljung_box_test(squared_returns)
-            
+        for j, symbol in enumerate(symbols):
             metrics[symbol] = {
-                'annualized_volatility': annualized_vol,
-                'volatility_20d': vol_20d,
-                'volatility_60d': vol_60d,
-                'volatility_percentile': vol_percentile,
-                'downside_volatility': downside_vol,
-                'upside_downside_ratio': (annualized_vol / downside_vol) if downside_vol > 0 else np.inf,
-                'volatility_clustering': arch_stat > 0.05  # p-value interpretation
+                'annualized_volatility': annualized_vol[j],
+                'volatility_20d': vol_20d[j],
+                'volatility_60d': vol_60d[j],
+                'volatility_percentile': vol_percentile[j],
+                'downside_volatility': downside_vol[j],
+                'upside_downside_ratio': (annualized_vol[j] / downside_vol[j]) if downside_vol[j] > 0 else np.inf,
+                'volatility_clustering': arch_stat[j] > 0.05  # p-value interpretation
             }
         
-        return metrics
+        cache['volatility'] = metrics
+        return self._copy_symbol_metrics(metrics)
     
     def calculate_correlation_matrix(self) -> Tuple[pd.DataFrame, Dict[str, float]]:
         """Calculate correlation matrix and benchmark correlations"""
         if self.returns is None:
             self.fetch_data()
         
+        cache = self._current_metric_cache()
+        if 'correlation' in cache:
+            correlation_matrix, benchmark_correlations = cache['correlation']
+            return correlation_matrix.copy(), dict(benchmark_correlations)
+        
         print("🔗 Calculating correlation matrix...")
         
+        available = frozenset(self.returns.columns)
+        symbols = [s for s in self.symbols if s in available]
+        has_benchmark = self.benchmark in available
+        columns = symbols + [self.benchmark] if has_benchmark and self.benchmark not in symbols else symbols
+        
+        # One correlation pass over symbols and benchmark together
+        with np.errstate(invalid='ignore', divide='ignore'):
+            C = np.atleast_2d(np.corrcoef(self.returns[columns].to_numpy(dtype=np.float64), rowvar=False))
+        
         # Full correlation matrix
-        correlation_matrix = self.returns[self.symbols].corr()
+        n = len(symbols)
+        correlation_matrix = pd.DataFrame(C[:n, :n], index=symbols, columns=symbols)
         
         # Benchmark correlations
         benchmark_correlations = {}
-        if self.benchmark in self.returns.columns:
-            for symbol in self.symbols:
-                if symbol in self.returns.columns and symbol != self.benchmark:
-                    correlation = self.returns[symbol].corr(self.returns[self.benchmark])
-                    benchmark_correlations[symbol] = correlation
-        
-        return correlation_matrix, benchmark_correlations
+        if has_benchmark:
+            b = columns.index(self.benchmark)
+            for j, symbol in enumerate(symbols):
+                if symbol != self.benchmark:
+                    benchmark_correlations[symbol] = C[j, b]
+        
+        cache['correlation'] = (correlation_matrix, benchmark_correlations)
+        return correlation_matrix.copy(), dict(benchmark_correlations)
     
     def calculate_beta_metrics(self) -> Dict[str, Dict[str, float]]:
         """Calculate beta and related risk metrics"""
         if self.returns is None:
             self.fetch_data()
         
-        if self.benchmark not in self.returns.columns:
+        available = frozenset(self.returns.columns)
+        if self.benchmark not in available:
             print(f"⚠️ Benchmark {self.benchmark} not available")
             return {}
         
+        cache = self._current_metric_cache()
+        if 'beta' in cache:
+            return self._copy_symbol_metrics(cache['beta'])
+        
         print("📊 Calculating beta metrics...")
         
-        benchmark_returns = self.returns[self.benchmark]
+        symbols = [s for s in self.symbols if s in available and s != self.benchmark]
+        if not symbols:
+            return {}
+        
+        # Upcast: covariances of small daily returns need double precision
+        stock_returns = self.returns[symbols].to_numpy(dtype=np.float64)
+        benchmark_returns = self.returns[self.benchmark].to_numpy(dtype=np.float64)
+        
+        # Calculate beta
+        beta, covariance, market_variance, stock_mean, stock_variance = self._calculate_beta(stock_returns, benchmark_returns)
+        
+        # Calculate alpha (Jensen's alpha)
+        mean_stock_return = stock_mean * 252
+        mean_market_return = benchmark_returns.mean() * 252
+        alpha = mean_stock_return - beta * mean_market_return
+        
+        # R-squared
+        with np.errstate(invalid='ignore', divide='ignore'):
+            correlation = covariance / np.sqrt(stock_variance * market_variance)
+        r_squared = correlation ** 2
+        
+        # Upside/downside beta, both regimes in one matmul: with the benchmark demeaned within
+        # each regime (zero elsewhere) the weights sum to zero, so the stock side needs no centering
+        regimes = np.column_stack([benchmark_returns > 0, benchmark_returns < 0])
+        regime_counts = regimes.sum(axis=0)
+        regime_means = benchmark_returns @ regimes / np.maximum(regime_counts, 1)
+        weights = np.where(regimes, benchmark_returns[:, None] - regime_means, 0.0)
+        regime_var = np.einsum('ij,ij->j', weights, weights)
+        
+        with np.errstate(invalid='ignore', divide='ignore'):
+            regime_beta = stock_returns.T @ weights / regime_var
+        
+        # Ensure enough observations
+        regime_beta[:, (regime_counts <= 10) | (regime_var == 0)] = 0.0
+        upside_beta, downside_beta = regime_beta[:, 0], regime_beta[:, 1]
+        
         beta_metrics = {}
         
-        for symbol in self.symbols:
-            if symbol not in self.returns.columns or symbol == self.benchmark:
-                continue
-                
-            stock_returns = self.returns[symbol]
-            
-            # Calculate beta
-            covariance = np.cov(stock_returns, benchmark_returns)[0, 1]
-            market_variance = np.var(benchmark_returns)
-            beta = covariance / market_variance if market_variance != 0 else 0
-            
-            # Calculate alpha (Jensen's alpha)
-            mean_stock_return = stock_returns.mean() * 252
-            mean_market_return = benchmark_returns.mean() * 252
-            alpha = mean_stock_return - beta * mean_market_return
-            
-            # R-squared
-            correlation = stock_returns.corr(benchmark_returns)
-            r_squared = correlation ** 2
-            
-            # Upside/downside beta
-            up_market = benchmark_returns > 0
-            down_market = benchmark_returns < 0
-            
-            upside_beta = 0
-            downside_beta = 0
-            
-            if up_market.sum() > 10:  # Ensure enough observations
-                upside_cov = np.cov(stock_returns[up_market], benchmark_returns[up_market])[0, 1]
-                upside_var = np.var(benchmark_returns[up_market])
-                upside_beta = upside_cov / upside_var if upside_var != 0 else 0
-            
-            if down_market.sum() > 10:
-                downside_cov = np.cov(stock_returns[down_market], benchmark_returns[down_market])[0, 1]
-                downside_var = np.var(benchmark_returns[down_market])
-                downside_beta = downside_cov / downside_var if downside_var != 0 else 0
-            
+        for j, symbol in enumerate(symbols):
             beta_metrics[symbol] = {
-                'beta': beta,
-                'alpha_annualized': alpha,
-                'r_squared': r_squared,
-                'upside_beta': upside_beta,
-                'downside_beta': downside_beta,
-                'beta_asymmetry': upside_beta - downside_beta
+                'beta': beta[j],
+                'alpha_annualized': alpha[j],
+                'r_squared': r_squared[j],
+                'upside_beta': upside_beta[j],
+                'downside_beta': downside_beta[j],
+                'beta_asymmetry': upside_beta[j] - downside_beta[j]
             }
         
-        return beta_metrics
+        cache['beta'] = beta_metrics
+        return self._copy_symbol_metrics(beta_metrics)
     
     def analyze_volume_patterns(self) -> Dict[str, Dict[str, float]]:
         """Analyze volume patterns and relationships with price movements"""
+        cache = self._current_metric_cache()
+        if 'volume' in cache:
+            return self._copy_symbol_metrics(cache['volume'])
+        
         print("📊 Analyzing volume patterns...")
         
-        volume_metrics = {}
+        if not self.symbols:
+            return {}
         
-        for symbol in self.symbols:
-            try:
-                # Fetch volume data separately
-                ticker = yf.Ticker(symbol)
-                hist = ticker.history(period=f"{self.lookback_days}d")
-                
-                if hist.empty or 'Volume' not in hist.columns:
+        volume_metrics = {}
+        failed = False
+        
+        # Fetch volume data separately; each ticker is its own HTTP round-trip, so overlap them
+        with ThreadPoolExecutor(max_workers=min(len(self.symbols), 16)) as executor:
+            futures = {executor.submit(self._fetch_history, symbol): symbol for symbol in self.symbols}
+            
+            for future in as_completed(futures):
+                symbol = futures[future]
+                try:
+                    hist = future.result()
+                    
+                    # No bars or no volume (e.g. an index) is a stable outcome, not a retryable failure
+                    if hist.empty or 'Volume' not in hist.columns:
+                        continue
+                    
+                    volume_metrics[symbol] = self._calculate_volume_metrics(hist)
+                    
+                except Exception as e:
+                    print(f"⚠️ Error analyzing volume for {symbol}: {e}")
+                    failed = True
                     continue
-                
-                volume = hist['Volume']
-                close = hist['Close']
-                returns = close.pct_change().dropna()
-                
-                # Volume statistics
-                avg_volume = volume.mean()
-                volume_std = volume.std()
-                volume_cv = volume_std / avg_volume  # Coefficient of variation
-                
-                # Volume-price relationship
-                volume_price_corr = volume.corr(close)
-                volume_return_corr = volume[1:].corr(returns)
-                
-                # Volume surge analysis
-                volume_zscore = (volume - volume.rolling(20).mean()) / volume.rolling(20).std()
-                volume_surges = (volume_zscore > 2).sum()
-                surge_frequency = volume_surges / len(volume)
-                
-                # On-balance volume trend
-                obv = self._calculate_obv(close, volume)
-                obv_trend = self._calculate_trend_strength(obv)
-                
-                volume_metrics[symbol] = {
-                    'avg_volume': avg_volume,
-                    'volume_volatility': volume_cv,
-                    'volume_price_correlation': volume_price_corr,
-                    'volume_return_correlation': volume_return_corr,
-                    'volume_surge_frequency': surge_frequency,
-                    'obv_trend_strength': obv_trend
-                }
-                
-            except Exception as e:
-                print(f"⚠️ Error analyzing volume for {symbol}: {e}")
-                continue
         
-        return volume_metrics
+        # Keep results in the configured symbol order regardless of completion order
+        volume_metrics = {symbol: volume_metrics[symbol] for symbol in self.symbols if symbol in volume_metrics}
+        
+        # Don't memoize after a fetch error so the failed symbols are retried on the next call
+        if not failed:
+            cache['volume'] = volume_metrics
+        return self._copy_symbol_metrics(volume_metrics)
     
     def identify_regime_changes(self) -> Dict[str, List[datetime]]:
         """Identify volatility and correlation regime changes"""
@@ -240,30 +327,29 @@ class MarketAnalyzer:
         
         print("🔄 Identifying regime changes...")
         
-        regime_changes = {}
+        available = frozenset(self.returns.columns)
+        symbols = [s for s in self.symbols if s in available]
+        if not symbols:
+            return {}
         
-        # Volatility regime changes
-        for symbol in self.symbols:
-            if symbol not in self.returns.columns:
-                continue
-                
-            returns = self.returns[symbol]
-            
-            # Rolling volatility
-            rolling_vol = returns.rolling(60).std()
-            vol_median = rolling_vol.median()
-            
-            # Identify regime switches (simplified Markov switching model)
+        returns = self.returns[symbols]
+        
+        # Rolling volatility
+        rolling_vol = self._rolling_std(np.asfortranarray(returns.to_numpy()), 60)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)  # all-NaN column when history < window
+            vol_median = np.nanmedian(rolling_vol, axis=0)
+        
+        # Identify regime switches (simplified Markov switching model);
+        # prepend the starting low-vol regime so a high-vol first day counts as a switch
+        with np.errstate(invalid='ignore'):
             high_vol_regime = rolling_vol > vol_median * 1.5
-            regime_switches = []
-            
-            previous_regime = False
-            for date, is_high_vol in high_vol_regime.items():
-                if is_high_vol != previous_regime:
-                    regime_switches.append(date)
-                previous_regime = is_high_vol
-            
-            regime_changes[symbol] = regime_switches
+        switches = np.diff(high_vol_regime.astype(np.int8), axis=0, prepend=0) != 0
+        
+        regime_changes = {}
+        
+        for j, symbol in enumerate(symbols):
+            regime_changes[symbol] = returns.index[np.flatnonzero(switches[:, j])].tolist()
         
         return regime_changes
     
@@ -402,94 +488,264 @@ class MarketAnalyzer:
         
         print(f"📝 Exporting analysis report to {filename}...")
         
+        # Assemble the whole report in memory, then write it out in one call
+        buf = io.StringIO()
+        
+        buf.write("=" * 80 + "\n")
+        buf.write("TRADEHUNTER MARKET ANALYSIS REPORT\n")
+        buf.write(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+        buf.write(f"Symbols Analyzed: {', '.join(self.symbols)}\n")
+        buf.write(f"Benchmark: {self.benchmark}\n")
+        buf.write(f"Analysis Period: {self.lookback_days} days\n")
+        buf.write("=" * 80 + "\n\n")
+        
+        # Volatility Analysis
+        buf.write("VOLATILITY ANALYSIS\n")
+        buf.write("-" * 40 + "\n")
+        vol_metrics = self.calculate_volatility_metrics()
+        for symbol, metrics in vol_metrics.items():
+            buf.write(f"\n{symbol}:\n")
+            for metric, value in metrics.items():
+                buf.write(f"  {metric}: {value:.4f}\n")
+        
+        # Beta Analysis  
+        buf.write("\n\nBETA ANALYSIS\n")
+        buf.write("-" * 40 + "\n")
+        beta_metrics = self.calculate_beta_metrics()
+        for symbol, metrics in beta_metrics.items():
+            buf.write(f"\n{symbol}:\n")
+            for metric, value in metrics.items():
+                buf.write(f"  {metric}: {value:.4f}\n")
+        
+        # Trading Insights
+        buf.write("\n\nTRADING INSIGHTS\n")
+        buf.write("-" * 40 + "\n")
+        insights = self.generate_trading_insights()
+        for symbol, insight in insights.items():
+            buf.write(f"\n{symbol}: {insight}\n")
+        
+        # Strategy Recommendations
+        buf.write("\n\nSTRATEGY RECOMMENDATIONS\n")
+        buf.write("-" * 40 + "\n")
+        recommendations = self.create_strategy_recommendations()
+        for symbol, rec in recommendations.items():
+            buf.write(f"\n{symbol}:\n")
+            buf.write(f"  Primary Strategy: {rec['primary_strategy']}\n")
+            buf.write(f"  Position Sizing: {rec['position_sizing']}\n")
+            buf.write(f"  Risk Multiplier: {rec['risk_multiplier']}\n")
+            buf.write(f"  Stop Loss Adjustment: {rec['stop_loss_adjustment']}\n")
+            buf.write(f"  Optimal Timeframes: {', '.join(rec['optimal_timeframes'])}\n")
+            if rec['avoid_conditions']:
+                buf.write(f"  Avoid Conditions: {', '.join(rec['avoid_conditions'])}\n")
+            if rec['special_considerations']:
+                buf.write(f"  Special Considerations: {', '.join(rec['special_considerations'])}\n")
+        
         with open(filename, 'w') as f:
-            f.write("=" * 80 + "\n")
-            f.write("TRADEHUNTER MARKET ANALYSIS REPORT\n")
-            f.write(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-            f.write(f"Symbols Analyzed: {', '.join(self.symbols)}\n")
-            f.write(f"Benchmark: {self.benchmark}\n")
-            f.write(f"Analysis Period: {self.lookback_days} days\n")
-            f.write("=" * 80 + "\n\n")
-            
-            # Volatility Analysis
-            f.write("VOLATILITY ANALYSIS\n")
-            f.write("-" * 40 + "\n")
-            vol_metrics = self.calculate_volatility_metrics()
-            for symbol, metrics in vol_metrics.items():
-                f.write(f"\n{symbol}:\n")
-                for metric, value in metrics.items():
-                    f.write(f"  {metric}: {value:.4f}\n")
-            
-            # Beta Analysis  
-            f.write("\n\nBETA ANALYSIS\n")
-            f.write("-" * 40 + "\n")
-            beta_metrics = self.calculate_beta_metrics()
-            for symbol, metrics in beta_metrics.items():
-                f.write(f"\n{symbol}:\n")
-                for metric, value in metrics.items():
-                    f.write(f"  {metric}: {value:.4f}\n")
-            
-            # Trading Insights
-            f.write("\n\nTRADING INSIGHTS\n")
-            f.write("-" * 40 + "\n")
-            insights = self.generate_trading_insights()
-            for symbol, insight in insights.items():
-                f.write(f"\n{symbol}: {insight}\n")
-            
-            # Strategy Recommendations
-            f.write("\n\nSTRATEGY RECOMMENDATIONS\n")
-            f.write("-" * 40 + "\n")
-            recommendations = self.create_strategy_recommendations()
-            for symbol, rec in recommendations.items():
-                f.write(f"\n{symbol}:\n")
-                f.write(f"  Primary Strategy: {rec['primary_strategy']}\n")
-                f.write(f"  Position Sizing: {rec['position_sizing']}\n")
-                f.write(f"  Risk Multiplier: {rec['risk_multiplier']}\n")
-                f.write(f"  Stop Loss Adjustment: {rec['stop_loss_adjustment']}\n")
-                f.write(f"  Optimal Timeframes: {', '.join(rec['optimal_timeframes'])}\n")
-                if rec['avoid_conditions']:
-                    f.write(f"  Avoid Conditions: {', '.join(rec['avoid_conditions'])}\n")
-                if rec['special_considerations']:
-                    f.write(f"  Special Considerations: {', '.join(rec['special_considerations'])}\n")
+            f.write(buf.getvalue())
         
         print(f"✅ Analysis report exported to {filename}")
         return filename
     
     # Helper methods
-    def _ljung_box_test(self, series: pd.Series, lags: int = 10) -> float:
-        """Ljung-Box test for autocorrelation (simplified)"""
-        try:
-            from statsmodels.stats.diagnostic import acorr_ljungbox
-            result = acorr_ljungbox(series, lags=lags, return_df=True)
-            return result['lb_pvalue'].iloc[-1]
-        except ImportError:
-            # Fallback if statsmodels not available
-            return 0.5
+    def _set_price_data(self, data: pd.DataFrame):
+        """Store prices and derived returns in column-major layout for fast column-wise reductions"""
+        self.data = self._to_column_major(data)
+        
+        # pct_change().dropna() on the raw buffer: one divide/subtract pass, layout preserved
+        prices = self.data.to_numpy()
+        with np.errstate(invalid='ignore', divide='ignore'):
+            returns = (prices[1:] / prices[:-1] - 1.0).astype(self.FLOAT_DTYPE, order='F', copy=False)
+        index = self.data.index[1:]
+        
+        valid = ~np.isnan(returns).any(axis=1)
+        if not valid.all():
+            returns, index = np.asfortranarray(returns[valid]), index[valid]
+        
+        self.returns = pd.DataFrame(returns, index=index, columns=self.data.columns, copy=False)
+    
+    def _is_complete_download(self, data: pd.DataFrame, symbols: List[str]) -> bool:
+        """True if the price frame has rows and at least one price for every requested symbol"""
+        if data.empty or not all(s in data.columns for s in symbols):
+            return False
+        return not data[symbols].isna().all().any()
+    
+    def _current_metric_cache(self) -> Dict[str, object]:
+        """Memoized metrics for the current inputs, reset when data, returns, symbols or benchmark change"""
+        source = self._metric_cache_source
+        if (source is None or source[0] is not self.data or source[1] is not self.returns
+                or source[2] != tuple(self.symbols) or source[3] != self.benchmark):
+            self._metric_cache = {}
+            self._metric_cache_source = (self.data, self.returns, tuple(self.symbols), self.benchmark)
+        return self._metric_cache
+    
+    def _copy_symbol_metrics(self, metrics: Dict[str, Dict[str, float]]) -> Dict[str, Dict[str, float]]:
+        """Per-call copy of memoized per-symbol metrics, so callers can modify results without touching the cache"""
+        return {symbol: dict(values) for symbol, values in metrics.items()}
+    
+    def _to_column_major(self, frame: pd.DataFrame, dtype: type = np.float64) -> pd.DataFrame:
+        """Rebuild a frame on a Fortran-ordered buffer so each column is one contiguous span"""
+        values = np.asfortranarray(frame.to_numpy(dtype=dtype))
+        return pd.DataFrame(values, index=frame.index, columns=frame.columns, copy=False)
+    
+    def _cache_path(self, symbols: List[str], end_date: datetime) -> Optional[Path]:
+        """Parquet cache location for a symbol set, lookback and end date"""
+        if self.cache_dir is None:
+            return None
+        
+        # hashlib rather than hash(): the key must be stable across interpreter runs
+        key = hashlib.sha1(f"{','.join(sorted(symbols))}|{self.lookback_days}".encode()).hexdigest()[:16]
+        return Path(self.cache_dir) / f"{key}_{end_date.date()}.parquet"
+    
+    def _ljung_box_test(self, values: np.ndarray, lags: int = 10) -> np.ndarray:
+        """Ljung-Box p-value at the given lag for each column, using FFT autocorrelation"""
+        n = values.shape[0]
+        if n <= lags:
+            return np.full(values.shape[1], np.nan)
+        
+        # Zero-padding to 2n turns the circular FFT correlation into the linear one
+        centered = values - values.mean(axis=0)
+        spectrum = np.fft.rfft(centered, n=2 * n, axis=0)
+        autocov = np.fft.irfft(spectrum * np.conj(spectrum), n=2 * n, axis=0)[:lags + 1]
+        
+        with np.errstate(invalid='ignore', divide='ignore'):
+            rho = autocov[1:] / autocov[0]
+        q_stat = n * (n + 2) * (rho ** 2 / (n - np.arange(1, lags + 1))[:, None]).sum(axis=0)
+        
+        return stats.chi2.sf(q_stat, df=lags)
+    
+    def _calculate_beta(self, stock_returns: np.ndarray,
+                        benchmark_returns: np.ndarray) -> Tuple[np.ndarray, np.ndarray, float, np.ndarray, np.ndarray]:
+        """
+        Column-wise beta against the benchmark
+        
+        Returns:
+            beta, stock/benchmark covariances, benchmark variance, stock means and stock variances
+            (variances and covariances are sample estimates, ddof=1)
+        """
+        n = len(benchmark_returns)
+        stock_mean = stock_returns.mean(axis=0)
+        benchmark_mean = benchmark_returns.mean()
+        
+        # Post-hoc moments (sum(xy) - n*mean(x)*mean(y)) skip the centered copy of the returns matrix.
+        # They lose precision when a mean dwarfs its spread, so fall back to centering in that case.
+        stock_sumsq = np.einsum('ij,ij->j', stock_returns, stock_returns)
+        stock_var = stock_sumsq / n - stock_mean ** 2
+        benchmark_var = benchmark_returns @ benchmark_returns / n - benchmark_mean ** 2
+        
+        if (np.all(stock_var > 0) and benchmark_var > 0
+                and np.all(stock_mean ** 2 < self.CANCELLATION_RATIO * stock_var)
+                and benchmark_mean ** 2 < self.CANCELLATION_RATIO * benchmark_var):
+            covariance = (stock_returns.T @ benchmark_returns - n * stock_mean * benchmark_mean) / (n - 1)
+            variance = benchmark_var * n / (n - 1)
+            stock_variance = stock_var * n / (n - 1)
+        else:
+            stock_centered = stock_returns - stock_mean
+            benchmark_centered = benchmark_returns - benchmark_mean
+            covariance = stock_centered.T @ benchmark_centered / (n - 1)
+            variance = benchmark_centered @ benchmark_centered / (n - 1)
+            stock_variance = np.einsum('ij,ij->j', stock_centered, stock_centered) / (n - 1)
+        
+        beta = covariance / variance if variance != 0 else np.zeros_like(covariance)
+        
+        return beta, covariance, variance, stock_mean, stock_variance
+    
+    def _fetch_history(self, symbol: str) -> pd.DataFrame:
+        """Fetch OHLCV history for a single symbol over the lookback period"""
+        ticker = yf.Ticker(symbol)
+        return ticker.history(period=f"{self.lookback_days}d")
+    
+    def _calculate_volume_metrics(self, hist: pd.DataFrame) -> Dict[str, float]:
+        """Calculate volume statistics from a symbol's OHLCV history"""
+        volume = hist['Volume']
+        close = hist['Close']
+        returns = close.pct_change().dropna()
+        
+        # Volume statistics
+        avg_volume = volume.mean()
+        volume_std = volume.std()
+        volume_cv = volume_std / avg_volume  # Coefficient of variation
+        
+        # Volume-price relationship
+        volume_price_corr = volume.corr(close)
+        volume_return_corr = volume[1:].corr(returns)
+        
+        # Volume surge analysis
+        volume_surges = self._count_volume_surges(volume.to_numpy(dtype=self.FLOAT_DTYPE))
+        surge_frequency = volume_surges / len(volume)
+        
+        # On-balance volume trend
+        obv = self._calculate_obv(close, volume)
+        obv_trend = self._calculate_trend_strength(obv)
+        
+        return {
+            'avg_volume': avg_volume,
+            'volume_volatility': volume_cv,
+            'volume_price_correlation': volume_price_corr,
+            'volume_return_correlation': volume_return_corr,
+            'volume_surge_frequency': surge_frequency,
+            'obv_trend_strength': obv_trend
+        }
+    
+    def _count_volume_surges(self, volume: np.ndarray, window: int = 20, threshold: float = 2.0) -> int:
+        """Count days with a rolling volume z-score above threshold, without materializing the z-scores"""
+        # z > k  <=>  v > mean + k * std; build the bound in the rolling-std buffer itself
+        bound = self._rolling_std(volume, window)
+        bound *= threshold
+        bound += self._rolling_mean(volume, window)
+        with np.errstate(invalid='ignore'):
+            return int(np.count_nonzero(volume > bound))
+    
+    def _rolling_mean(self, values: np.ndarray, window: int) -> np.ndarray:
+        """Column-wise rolling mean (NaN until the window fills)"""
+        if bn is not None and window <= len(values):
+            return bn.move_mean(values, window, axis=0)
+        return pd.DataFrame(values).rolling(window).mean().to_numpy(dtype=values.dtype, copy=True).reshape(values.shape)
+    
+    def _rolling_std(self, values: np.ndarray, window: int) -> np.ndarray:
+        """Column-wise rolling sample standard deviation (NaN until the window fills)"""
+        if bn is not None and window <= len(values):
+            return bn.move_std(values, window, axis=0, ddof=1)
+        return pd.DataFrame(values).rolling(window).std().to_numpy(dtype=values.dtype, copy=True).reshape(values.shape)
     
     def _calculate_obv(self, close: pd.Series, volume: pd.Series) -> pd.Series:
         """Calculate On-Balance Volume"""
-        obv = np.zeros(len(close))
-        obv[0] = volume.iloc[0]
+        c = close.to_numpy(dtype=np.float64)
+        v = volume.to_numpy(dtype=np.float64)
         
-        for i in range(1, len(close)):
-            if close.iloc[i] > close.iloc[i-1]:
-                obv[i] = obv[i-1] + volume.iloc[i]
-            elif close.iloc[i] < close.iloc[i-1]:
-                obv[i] = obv[i-1] - volume.iloc[i]
-            else:
-                obv[i] = obv[i-1]
+        obv = np.empty(len(v), dtype=self.FLOAT_DTYPE)
+        if len(v) == 0:
+            return pd.Series(obv, index=close.index)
+        
+        # +volume on up days, -volume on down days, 0 when unchanged; explicit comparisons
+        # (not np.sign) so a NaN close carries OBV forward like the original loop did
+        delta = np.where(c[1:] > c[:-1], v[1:], np.where(c[1:] < c[:-1], -v[1:], 0.0))
+        obv[0] = v[0]
+        obv[1:] = v[0] + np.cumsum(delta)
         
         return pd.Series(obv, index=close.index)
     
-    def _calculate_trend_strength(self, series: pd.Series, window: int = 20) -> float:
+    def _calculate_trend_strength(self, series: pd.Series, window: int = TREND_WINDOW) -> float:
         """Calculate trend strength using linear regression slope"""
-        try:
-            x = np.arange(len(series[-window:]))
-            y = series[-window:].values
-            slope, _, r_value, _, _ = stats.linregress(x, y)
-            return slope * r_value  # Slope adjusted by R-squared
-        except:
+        y = series.iloc[-window:].to_numpy(dtype=np.float64)
+        n = len(y)
+        if n < 2:
             return 0.0
+        
+        # Closed-form OLS against x = 0..n-1, whose centered moments are known constants
+        if n == len(self._trend_x_centered):
+            x_centered, sxx = self._trend_x_centered, self._trend_sxx
+        else:
+            x_centered = np.arange(n) - (n - 1) / 2
+            sxx = n * (n * n - 1) / 12
+        y_centered = y - y.mean()
+        sxy = x_centered @ y_centered
+        syy = y_centered @ y_centered
+        if syy == 0:
+            return 0.0
+        
+        slope = sxy / sxx
+        r_value = sxy / np.sqrt(sxx * syy)
+        return slope * r_value  # Slope adjusted by R-squared
 
 # Example usage and main execution
 if __name__ == "__main__":